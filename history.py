@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Histórico local de eventos de alarme (disparo, soneca, parada e comandos remotos).
+
+Os eventos ficam num buffer circular de tamanho fixo mapeado em memória (mmap),
+então o arquivo nunca cresce. As estatísticas (por dia, por alarme, média de
+sonecas e latência disparo → parada) são mantidas de forma incremental: cada
+evento gravado soma nos contadores e cada evento sobrescrito no buffer é
+subtraído, de modo que a leitura é O(1) e não precisa varrer o buffer nem
+acessar a rede.
+"""
+
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+HISTORY_CAPACITY = 4096  # número de eventos guardados no buffer
+
+EVENT_FIRE = 1
+EVENT_SNOOZE = 2
+EVENT_STOP = 3
+EVENT_REMOTE = 4
+
+EVENT_NAMES = {
+    EVENT_FIRE: "fire",
+    EVENT_SNOOZE: "snooze",
+    EVENT_STOP: "stop",
+    EVENT_REMOTE: "remote",
+}
+
+# Cabeçalho: magic, versão, capacidade, próxima posição de escrita, total de eventos
+_HEADER = struct.Struct("<4sHxxIII")
+_MAGIC = b"PCEV"
+_VERSION = 1
+# Registro: timestamp, valor (latência em s ou valor do comando; -1 = n/a), tipo, id do alarme
+_RECORD = struct.Struct("<ddB36s")
+
+
+class _Rollup:
+    """Contadores de um agrupamento (dia ou alarme)."""
+
+    __slots__ = ("counts", "latency_sum", "latency_n")
+
+    def __init__(self):
+        self.counts = {t: 0 for t in EVENT_NAMES}
+        self.latency_sum = 0.0
+        self.latency_n = 0
+
+    def apply(self, kind: int, value: float, sign: int):
+        self.counts[kind] += sign
+        if kind in (EVENT_SNOOZE, EVENT_STOP) and value >= 0:
+            self.latency_sum += sign * value
+            self.latency_n += sign
+
+    def is_empty(self) -> bool:
+        return not any(self.counts.values())
+
+    def to_dict(self) -> dict:
+        fires = self.counts[EVENT_FIRE]
+        return {
+            **{EVENT_NAMES[t]: n for t, n in self.counts.items()},
+            "mean_snoozes": (self.counts[EVENT_SNOOZE] / fires) if fires else 0.0,
+            "mean_latency_s": (self.latency_sum / self.latency_n) if self.latency_n else None,
+        }
+
+
+class EventHistory:
+    def __init__(self, path: str, capacity: int = HISTORY_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._pending_fire = None  # (timestamp, alarm_id) do disparo ainda sem resposta
+        self._total = _Rollup()
+        self._per_day: dict[str, _Rollup] = {}
+        self._per_alarm: dict[str, _Rollup] = {}
+        self._open()
+        self._rebuild()
+
+    # ---------- armazenamento ----------
+    def _open(self):
+        size = _HEADER.size + self.capacity * _RECORD.size
+        fresh = not os.path.exists(self.path) or os.path.getsize(self.path) != size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fresh:
+            os.ftruncate(self._fd, size)
+        self._mm = mmap.mmap(self._fd, size)
+        magic, version, capacity, head, count = _HEADER.unpack_from(self._mm, 0)
+        if (fresh or magic != _MAGIC or version != _VERSION or capacity != self.capacity
+                or head >= self.capacity):  # cabeçalho corrompido: recomeça do zero
+            self._mm[:] = bytes(size)
+            self._head, self._count = 0, 0
+            self._write_header()
+        else:
+            self._head, self._count = head, min(count, self.capacity)
+
+    def _write_header(self):
+        _HEADER.pack_into(self._mm, 0, _MAGIC, _VERSION, self.capacity, self._head, self._count)
+
+    def _offset(self, slot: int) -> int:
+        return _HEADER.size + slot * _RECORD.size
+
+    def _read(self, slot: int):
+        ts, value, kind, raw_id = _RECORD.unpack_from(self._mm, self._offset(slot))
+        return ts, value, kind, raw_id.rstrip(b"\0").decode("ascii", "replace")
+
+    def _rebuild(self):
+        """Recalcula os contadores a partir do buffer (só na abertura)."""
+        for ts, value, kind, alarm_id in self.iter_events():
+            self._apply(ts, value, kind, alarm_id, +1)
+
+    def _apply(self, ts: float, value: float, kind: int, alarm_id: str, sign: int):
+        if kind not in EVENT_NAMES:
+            return
+        day = datetime.fromtimestamp(ts).date().isoformat()
+        groups = [(self._per_day, day)]
+        if alarm_id:
+            groups.append((self._per_alarm, alarm_id))
+        self._total.apply(kind, value, sign)
+        for table, key in groups:
+            rollup = table.get(key)
+            if rollup is None:
+                rollup = table[key] = _Rollup()
+            rollup.apply(kind, value, sign)
+            if rollup.is_empty():
+                del table[key]
+
+    def close(self):
+        with self._lock:
+            self._mm.flush()
+            self._mm.close()
+            os.close(self._fd)
+
+    # ---------- gravação ----------
+    def record(self, kind: int, alarm_id: str = "", value: float = -1.0, ts: float | None = None):
+        """Grava um evento. Para soneca/parada a latência desde o disparo é calculada aqui."""
+        ts = time.time() if ts is None else ts
+        alarm_id = alarm_id or ""
+        with self._lock:
+            if kind == EVENT_FIRE:
+                self._pending_fire = (ts, alarm_id)
+            elif kind in (EVENT_SNOOZE, EVENT_STOP):
+                if self._pending_fire is not None:
+                    fired_at, fired_id = self._pending_fire
+                    value = max(ts - fired_at, 0.0)
+                    alarm_id = alarm_id or fired_id
+                    self._pending_fire = None
+                else:
+                    value = -1.0
+
+            slot = self._head
+            if self._count == self.capacity:
+                self._apply(*self._read(slot), -1)  # evento mais antigo sai do buffer
+            else:
+                self._count += 1
+            _RECORD.pack_into(self._mm, self._offset(slot), ts, value, kind,
+                              alarm_id.encode("ascii", "replace")[:36])
+            self._head = (slot + 1) % self.capacity
+            self._write_header()
+            self._apply(ts, value, kind, alarm_id, +1)
+
+    def rearm(self, alarm_id: str = "", ts: float | None = None):
+        """Alarme voltou a tocar após soneca: reinicia a latência sem contar um novo disparo."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            self._pending_fire = (ts, alarm_id or "")
+
+    def pending_alarm_id(self) -> str:
+        with self._lock:
+            return self._pending_fire[1] if self._pending_fire else ""
+
+    # ---------- leitura ----------
+    def iter_events(self):
+        """Eventos do mais antigo para o mais recente: (timestamp, valor, tipo, alarm_id)."""
+        start = (self._head - self._count) % self.capacity
+        for i in range(self._count):
+            yield self._read((start + i) % self.capacity)
+
+    def totals(self) -> dict:
+        with self._lock:
+            return self._total.to_dict()
+
+    def day_stats(self, day: str) -> dict:
+        """Estatísticas de um dia (formato ISO, ex.: "2025-11-03")."""
+        with self._lock:
+            rollup = self._per_day.get(day)
+            return (rollup or _Rollup()).to_dict()
+
+    def alarm_stats(self, alarm_id: str) -> dict:
+        with self._lock:
+            rollup = self._per_alarm.get(alarm_id)
+            return (rollup or _Rollup()).to_dict()
+
+    def mean_snoozes(self) -> float:
+        return self.totals()["mean_snoozes"]
+
+    def mean_latency(self):
+        return self.totals()["mean_latency_s"]
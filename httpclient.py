@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Cliente HTTP compartilhado do PiClock (clima, Ubidots, etc.).
+
+- Uma sessão `requests` por host, com pool de conexões reaproveitadas (keep-alive).
+- Cache de resolução DNS com TTL (e uso do último endereço conhecido se o DNS falhar).
+- Circuit breaker por endpoint: depois de algumas falhas seguidas o host é dado
+  como fora do ar e as chamadas falham na hora, sem esperar o timeout, até o
+  próximo teste ("half-open").
+- Orçamento de novas tentativas com backoff aleatório (jitter), para que as
+  retentativas nunca multipliquem a carga quando a rede está ruim.
+- Métricas de latência e erros por endpoint.
+"""
+
+import random
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DNS_TTL_S = 300
+DNS_STALE_MAX_S = 3600      # por quanto tempo um endereço vencido ainda serve se o DNS falhar
+BREAKER_FAILURES = 3        # falhas seguidas para abrir o circuito
+BREAKER_RESET_S = 30        # tempo inicial com o circuito aberto
+BREAKER_RESET_MAX_S = 600   # teto do tempo aberto (dobra a cada nova falha)
+RETRY_BUDGET_RATIO = 0.2    # cada requisição "ganha" 0,2 retentativa
+RETRY_BUDGET_MAX = 5.0
+RETRY_BACKOFF_S = 0.25
+RETRY_BACKOFF_MAX_S = 2.0
+
+
+# ====== DNS ======
+_dns_lock = threading.Lock()
+_dns_cache: dict[tuple, tuple[float, list]] = {}
+_orig_getaddrinfo = socket.getaddrinfo
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        hit = _dns_cache.get(key)
+    if hit and now - hit[0] < DNS_TTL_S:
+        return hit[1]
+    try:
+        result = _orig_getaddrinfo(host, port, *args, **kwargs)
+    except socket.gaierror:
+        if hit and now - hit[0] < DNS_STALE_MAX_S:  # DNS fora do ar: usa o último endereço conhecido
+            return hit[1]
+        raise
+    with _dns_lock:
+        _dns_cache[key] = (now, result)
+    return result
+
+
+def install_dns_cache():
+    """Ativa o cache de DNS no processo. Chamado uma vez na inicialização do app."""
+    socket.getaddrinfo = _cached_getaddrinfo
+
+
+# ====== CIRCUIT BREAKER ======
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.reset_s = BREAKER_RESET_S
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_s:
+                self.state = self.HALF_OPEN  # deixa passar uma requisição de teste
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.reset_s = BREAKER_RESET_S
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                self.reset_s = min(self.reset_s * 2, BREAKER_RESET_MAX_S)
+            if self.state == self.HALF_OPEN or self.failures >= BREAKER_FAILURES:
+                if self.state != self.OPEN:
+                    print(f"[HTTP] Circuito aberto por {self.reset_s}s")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+    """Balde de fichas: retentativas só acontecem se houver saldo."""
+
+    def __init__(self):
+        self.tokens = RETRY_BUDGET_MAX
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.tokens + RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX)
+
+    def withdraw(self) -> bool:
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class _Metrics:
+    __slots__ = ("requests", "errors", "retries", "short_circuited", "latency_ms_avg", "latency_ms_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.latency_ms_avg = 0.0
+        self.latency_ms_max = 0.0
+
+    def observe(self, latency_ms: float):
+        # média móvel exponencial, suficiente para um painel de diagnóstico
+        if self.latency_ms_avg == 0.0:
+            self.latency_ms_avg = latency_ms
+        else:
+            self.latency_ms_avg += 0.2 * (latency_ms - self.latency_ms_avg)
+        self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+# ====== CLIENTE ======
+class HttpClient:
+    def __init__(self, pool_maxsize: int = 4):
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._sessions: dict[str, requests.Session] = {}
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._metrics: dict[str, _Metrics] = {}
+        self.budget = RetryBudget()
+
+    @staticmethod
+    def _endpoint(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _get(self, endpoint: str):
+        with self._lock:
+            session = self._sessions.get(endpoint)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount(endpoint, adapter)
+                self._sessions[endpoint] = session
+                self._breakers[endpoint] = CircuitBreaker()
+                self._metrics[endpoint] = _Metrics()
+            return session, self._breakers[endpoint], self._metrics[endpoint]
+
+    def request(self, method: str, url: str, retries: int = 0, **kwargs):
+        """
+        Faz a requisição e devolve o `requests.Response`, ou None se o host
+        estiver com o circuito aberto ou a conexão falhar. Por padrão não há
+        retentativa: quem chama da thread do Tkinter não pode ficar esperando
+        o backoff; só as threads de fundo devem passar `retries`.
+        """
+        endpoint = self._endpoint(url)
+        session, breaker, metrics = self._get(endpoint)
+        kwargs.setdefault("timeout", 5)
+
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                with self._lock:
+                    metrics.short_circuited += 1
+                return None
+
+            start = time.perf_counter()
+            resp, error = None, None
+            try:
+                resp = session.request(method, url, **kwargs)
+            except Exception as e:
+                # Qualquer erro conta como falha, senão um teste "half-open" deixaria o circuito preso
+                error = e
+            latency_ms = (time.perf_counter() - start) * 1000
+
+            failed = error is not None or resp.status_code >= 500
+            with self._lock:
+                metrics.requests += 1
+                metrics.observe(latency_ms)
+                if failed:
+                    metrics.errors += 1
+            if not failed:
+                breaker.success()
+                return resp
+            breaker.failure()
+
+            if attempt >= retries or not self.budget.withdraw():
+                if error is not None:
+                    print(f"[HTTP] Falha em {endpoint}: {error}")
+                return resp
+            attempt += 1
+            with self._lock:
+                metrics.retries += 1
+            backoff = min(RETRY_BACKOFF_S * 2 ** attempt, RETRY_BACKOFF_MAX_S)
+            time.sleep(random.uniform(0, backoff))
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_json(self, url: str, **kwargs):
+        resp = self.get(url, **kwargs)
+        if resp is None or resp.status_code != 200:
+            return None
+        try:
+            return resp.json()
+        except ValueError:
+            return None
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                ep: {**m.to_dict(), "circuit": self._breakers[ep].state}
+                for ep, m in self._metrics.items()
+            }
+
+    def total_requests(self) -> int:
+        with self._lock:
+            return sum(m.requests for m in self._metrics.values())
+
+
+client = HttpClient()
@@ -4,26 +4,39 @@
 PiClock Touch – Relógio com alarme e clima melhorado
 """
 
-import requests
 import os
 import json
 import uuid
+import queue
 import threading
 import time
-from datetime import datetime, date, timedelta
+from datetime import datetime, timedelta
 import tkinter as tk
 from tkinter import ttk, messagebox
 from dotenv import load_dotenv
 
+from history import EventHistory, EVENT_FIRE, EVENT_SNOOZE, EVENT_STOP, EVENT_REMOTE
+from httpclient import client as http, install_dns_cache
+from sync import AlarmSync, HttpSyncTransport, UbidotsSyncTransport
+from power import PowerGovernor, Backlight
+
 # ====== CONFIGURAÇÕES ======
 load_dotenv()
 FULLSCREEN = False
 ALARM_FILE = "alarms.json"
+HISTORY_FILE = "events.bin"
 REFRESH_CLOCK_MS = 1000
 REFRESH_WEATHER_MS = 10 * 60 * 1000
 CHECK_ALARMS_MS = 1000
+SYNC_ALARMS_MS = 60 * 1000
+REMOTE_POLL_MS = 5000
+REMOTE_RETRY_MS = 1000
+# Diretório sysfs da luz de fundo (vazio = primeiro de /sys/class/backlight)
+BACKLIGHT_DIR = os.environ.get("PICLOCK_BACKLIGHT_DIR", "")
+WAKE_TAG = "PiClockWake"  # bindtag colocado antes de todos os widgets para interceptar o toque que acorda
 
 OWM_API_KEY = os.environ.get("OWM_API_KEY", "")
+OWM_API_URL = "https://api.openweathermap.org/data/2.5/weather"
 CITY = "São Paulo"
 COUNTRY_CODE = "BR"
 
@@ -39,6 +52,9 @@ PT_MONTHS = [
 
 UBIDOTS_TOKEN = os.environ.get("UBIDOTS_TOKEN", "")
 UBIDOTS_DEVICE = "piclock"  # nome que aparecerá no Ubidots
+UBIDOTS_API_URL = "https://industrial.api.ubidots.com/api/v1.6"
+# Sincronização de alarmes: URL de um servidor de sincronização ou "ubidots" (vazio = desligada)
+ALARM_SYNC_URL = os.environ.get("ALARM_SYNC_URL", "")
 
 # ====== ÁUDIO ======
 try:
@@ -60,17 +76,8 @@ except Exception:
             pass
 
 # ====== UTIL ======
-from urllib.request import urlopen
-from urllib.error import URLError
-import json as _json
-
 def http_get_json(url: str):
-    try:
-        with urlopen(url, timeout=5) as resp:
-            data = resp.read().decode("utf-8")
-            return _json.loads(data)
-    except Exception:
-        return None
+    return http.get_json(url, timeout=5)
     
 # ====== UBIDOTS ======
 def ubidots_send_batch(data: dict):
@@ -83,31 +90,56 @@ def ubidots_send_batch(data: dict):
     for variable, info in data.items():
         value = info.get("value")
         payload = {"value": value}
-        url = f"https://industrial.api.ubidots.com/api/v1.6/devices/{UBIDOTS_DEVICE}/{variable}/values"
+        url = f"{UBIDOTS_API_URL}/devices/{UBIDOTS_DEVICE}/{variable}/values"
         headers = {
             "X-Auth-Token": UBIDOTS_TOKEN,
             "Content-Type": "application/json"
         }
+        # Roda na thread de fundo do Ubidots: pode repetir sem travar a interface
+        resp = http.post(url, headers=headers, json=payload, timeout=10, retries=1)
+        if resp is None:
+            # Sem conexão ou circuito aberto: as demais variáveis falhariam igual
+            print("[ERRO] Ubidots indisponível, lote descartado")
+            return False
+        if resp.status_code < 400:
+            print(f"[OK] Ubidots: {variable} = {value}")
+        else:
+            print(f"[ERRO] Ubidots ({resp.status_code}): {resp.text}")
+            success = False
+    return success
+
+_ubidots_queue: queue.Queue = queue.Queue(maxsize=32)
+_ubidots_worker = None
+
+def _ubidots_worker_loop():
+    while True:
+        payload = _ubidots_queue.get()
         try:
-            resp = requests.post(url, headers=headers, json=payload, timeout=10)
-            if resp.status_code < 400:
-                print(f"[OK] Ubidots: {variable} = {value}")
-            else:
-                print(f"[ERRO] Ubidots ({resp.status_code}): {resp.text}")
-                success = False
+            ubidots_send_batch(payload)
         except Exception as e:
             print(f"[EXCEÇÃO] Ubidots: {e}")
-            success = False
-    return success
+
+def ubidots_send_async(data: dict):
+    """Enfileira um lote para envio por uma única thread de fundo (sem travar o Tkinter)."""
+    global _ubidots_worker
+    if _ubidots_worker is None or not _ubidots_worker.is_alive():
+        _ubidots_worker = threading.Thread(target=_ubidots_worker_loop, daemon=True)
+        _ubidots_worker.start()
+    try:
+        _ubidots_queue.put_nowait(data)
+    except queue.Full:
+        print("[UBIDOTS] Fila cheia, lote descartado")
 
 def ubidots_get_last_value(variable: str):
     """Obtém o último valor de uma variável do Ubidots."""
     if not UBIDOTS_TOKEN:
         return None
-    url = f"https://industrial.api.ubidots.com/api/v1.6/devices/{UBIDOTS_DEVICE}/{variable}/values"
+    url = f"{UBIDOTS_API_URL}/devices/{UBIDOTS_DEVICE}/{variable}/values"
     headers = {"X-Auth-Token": UBIDOTS_TOKEN}
+    resp = http.get(url, headers=headers, timeout=5)
+    if resp is None:
+        return None
     try:
-        resp = requests.get(url, headers=headers, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if data.get("results"):
@@ -151,7 +183,7 @@ def fetch_weather(city: str, country: str, api_key: str):
             "temp_max": "—"
         }
 
-    url = "https://api.openweathermap.org/data/2.5/weather"
+    url = OWM_API_URL
     params = {
         "q": f"{city},{country}",
         "appid": api_key,
@@ -159,8 +191,17 @@ def fetch_weather(city: str, country: str, api_key: str):
         "lang": "pt_br"
     }
 
+    response = http.get(url, params=params, timeout=10)
+    if response is None:
+        return {
+            "temp": "—",
+            "descr": "Falha de conexão",
+            "icon": "🌡️",
+            "temp_min": "—",
+            "temp_max": "—"
+        }
+
     try:
-        response = requests.get(url, params=params, timeout=10)
         data = response.json()
 
         if response.status_code != 200 or "main" not in data or "weather" not in data:
@@ -199,12 +240,18 @@ def fetch_weather(city: str, country: str, api_key: str):
 
 # ====== MODELO ======
 class Alarm:
-    def __init__(self, alarm_id: str, hour: int, minute: int, days: list[int], enabled: bool = True):
+    def __init__(self, alarm_id: str, hour: int, minute: int, days: list[int], enabled: bool = True,
+                 once: bool = False, updated_at: float | None = None, snooze_of: str = "",
+                 on_date: str = ""):
         self.id = alarm_id
         self.hour = hour
         self.minute = minute
         self.days = days
         self.enabled = enabled
+        self.once = once  # alarme de uso único (ex.: soneca), removido após tocar
+        self.snooze_of = snooze_of  # id do alarme original, quando é uma soneca
+        self.on_date = on_date  # data (ISO) de um alarme de uso único
+        self.updated_at = time.time() if updated_at is None else updated_at  # usado na sincronização
         self._last_trigger_key = None
 
     @staticmethod
@@ -215,6 +262,10 @@ class Alarm:
             int(d.get("minute", 0)),
             list(d.get("days", [])),
             bool(d.get("enabled", True)),
+            bool(d.get("once", False)),
+            float(d.get("updated_at", 0.0)),
+            str(d.get("snooze_of", "")),
+            str(d.get("on_date", "")),
         )
 
     def to_dict(self) -> dict:
@@ -224,6 +275,10 @@ class Alarm:
             "minute": self.minute,
             "days": self.days,
             "enabled": self.enabled,
+            "once": self.once,
+            "updated_at": self.updated_at,
+            "snooze_of": self.snooze_of,
+            "on_date": self.on_date,
         }
 
     def matches_now(self, now: datetime) -> bool:
@@ -232,13 +287,22 @@ class Alarm:
         weekday = now.weekday()
         if weekday not in self.days:
             return False
+        if self.on_date and now.date().isoformat() != self.on_date:
+            return False
         hm = (now.hour, now.minute)
-        key = f"{date.today().isoformat()}-{hm[0]:02d}:{hm[1]:02d}"
+        key = f"{now.date().isoformat()}-{hm[0]:02d}:{hm[1]:02d}"
         if hm == (self.hour, self.minute) and self._last_trigger_key != key:
             self._last_trigger_key = key
             return True
         return False
 
+    def is_expired(self, now: datetime) -> bool:
+        """Alarme de uso único cujo minuto já passou (ex.: app desligado na hora da soneca)."""
+        if not self.once or not self.on_date:
+            return False
+        due = datetime.fromisoformat(f"{self.on_date}T{self.hour:02d}:{self.minute:02d}")
+        return now >= due + timedelta(minutes=1)
+
     def human_time(self) -> str:
         return f"{self.hour:02d}:{self.minute:02d}"
 
@@ -251,6 +315,7 @@ class AlarmStore:
     def __init__(self, path: str):
         self.path = path
         self.alarms: list[Alarm] = []
+        self.revision = 0  # incrementado a cada alteração salva
         self.load()
 
     def load(self):
@@ -263,16 +328,19 @@ class AlarmStore:
             self.alarms = [Alarm.from_dict(a) for a in data.get("alarms", [])]
         except Exception:
             self.alarms = []
+        self.drop_expired(datetime.now())
 
     def save(self):
+        self.revision += 1
         data = {"alarms": [a.to_dict() for a in self.alarms]}
         tmp = self.path + ".tmp"
         with open(tmp, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
         os.replace(tmp, self.path)
 
-    def add(self, hour: int, minute: int, days: list[int]):
-        a = Alarm(str(uuid.uuid4()), hour, minute, days, True)
+    def add(self, hour: int, minute: int, days: list[int], once: bool = False, snooze_of: str = "",
+            on_date: str = ""):
+        a = Alarm(str(uuid.uuid4()), hour, minute, days, True, once, snooze_of=snooze_of, on_date=on_date)
         self.alarms.append(a)
         self.save()
         return a
@@ -281,8 +349,41 @@ class AlarmStore:
         self.alarms = [a for a in self.alarms if a.id != alarm_id]
         self.save()
 
+    def drop_expired(self, now: datetime):
+        alive = [a for a in self.alarms if not a.is_expired(now)]
+        if len(alive) != len(self.alarms):
+            self.alarms = alive
+            self.save()
+
+    def apply_changes(self, upserts: list[dict], deleted_ids: set[str]):
+        """Aplica alterações vindas da sincronização (por id) e salva uma única vez."""
+        by_id = {a.id: a for a in self.alarms}
+        for d in upserts:
+            incoming = Alarm.from_dict(d)
+            current = by_id.get(incoming.id)
+            if current is None:
+                self.alarms.append(incoming)
+                by_id[incoming.id] = incoming
+            else:
+                # Atualiza no lugar para manter o controle de disparo (_last_trigger_key)
+                current.hour, current.minute = incoming.hour, incoming.minute
+                current.days, current.enabled = incoming.days, incoming.enabled
+                current.once, current.updated_at = incoming.once, incoming.updated_at
+        if deleted_ids:
+            self.alarms = [a for a in self.alarms if a.id not in deleted_ids]
+        self.save()
+
     def get_next_alarm(self, now: datetime):
         """Retorna o próximo alarme futuro."""
+        upcoming = self._upcoming(now)
+        return upcoming[1] if upcoming else None
+
+    def get_next_alarm_time(self, now: datetime):
+        """Retorna o horário (datetime) do próximo alarme futuro."""
+        upcoming = self._upcoming(now)
+        return upcoming[0] if upcoming else None
+
+    def _upcoming(self, now: datetime):
         future_alarms = []
         for a in self.alarms:
             if not a.enabled:
@@ -295,7 +396,7 @@ class AlarmStore:
                         future_alarms.append((candidate_time, a))
         if not future_alarms:
             return None
-        return min(future_alarms, key=lambda x: x[0])[1]
+        return min(future_alarms, key=lambda x: x[0])
 
 # ====== APP ======
 class PiClockApp(tk.Tk):
@@ -314,9 +415,22 @@ class PiClockApp(tk.Tk):
         self.fonts = {}
         self._build_fonts(scale=1.0)
         self.bind("<Configure>", self._on_configure)
+        self.bind_class(WAKE_TAG, "<ButtonPress>", self._on_touch)
+        self.bind_class(WAKE_TAG, "<ButtonRelease>", self._on_touch_release)
+        self._swallow_release = False
 
         self.store = AlarmStore(ALARM_FILE)
+        self.history = EventHistory(HISTORY_FILE)
+        self.sync = None
+        if ALARM_SYNC_URL == "ubidots":
+            self.sync = AlarmSync(self.store, UbidotsSyncTransport(UBIDOTS_TOKEN, UBIDOTS_DEVICE, api_url=UBIDOTS_API_URL))
+        elif ALARM_SYNC_URL:
+            self.sync = AlarmSync(self.store, HttpSyncTransport(ALARM_SYNC_URL))
         self.audio = AudioPlayer()
+        self.power = PowerGovernor(Backlight(BACKLIGHT_DIR))
+        self._next_alarm_cache = None
+        self._ticks = {}  # nome -> (id do after, intervalo base, função, início da espera)
+        self._sync_running = False
         self.weather = None
 
         self.container = ttk.Frame(self)
@@ -331,21 +445,32 @@ class PiClockApp(tk.Tk):
             frame.grid(row=0, column=0, sticky="nsew")
 
         self.show_frame("MainScreen")
+        self._install_wake_tag(self)
 
         self.after(REFRESH_CLOCK_MS, self._tick_clock)
         self.after(CHECK_ALARMS_MS, self._tick_alarms)
         self.after(100, self._tick_weather)
-        self.after(1000, self._tick_remote_commands)
+        self.after(REMOTE_RETRY_MS, self._tick_remote_commands)
+        if self.sync:
+            self.after(2000, self._tick_sync)
 
     def _build_fonts(self, scale: float):
         import tkinter.font as tkfont
-        self.fonts["clock"] = tkfont.Font(family="DejaVu Sans", size=int(72 * scale), weight="bold")
-        self.fonts["date"] = tkfont.Font(family="DejaVu Sans", size=int(22 * scale))
-        self.fonts["weather_temp"] = tkfont.Font(family="DejaVu Sans", size=int(32 * scale), weight="bold")
-        self.fonts["weather_descr"] = tkfont.Font(family="DejaVu Sans", size=int(16 * scale))
-        self.fonts["button"] = tkfont.Font(family="DejaVu Sans", size=int(18 * scale), weight="bold")
-        self.fonts["list"] = tkfont.Font(family="DejaVu Sans", size=int(16 * scale))
-        self.fonts["title"] = tkfont.Font(family="DejaVu Sans", size=int(24 * scale), weight="bold")
+        specs = {
+            "clock": (72, "bold"),
+            "date": (22, "normal"),
+            "weather_temp": (32, "bold"),
+            "weather_descr": (16, "normal"),
+            "button": (18, "bold"),
+            "list": (16, "normal"),
+            "title": (24, "bold"),
+        }
+        for name, (size, weight) in specs.items():
+            # Reaproveita as fontes já criadas: cada <Configure> criaria novas fontes Tk
+            if name in self.fonts:
+                self.fonts[name].configure(size=int(size * scale))
+            else:
+                self.fonts[name] = tkfont.Font(family="DejaVu Sans", size=int(size * scale), weight=weight)
 
     def _on_configure(self, event):
         h = max(self.winfo_height(), 1)
@@ -355,6 +480,56 @@ class PiClockApp(tk.Tk):
             if hasattr(f, "on_scale_change"):
                 f.on_scale_change()
 
+    def _install_wake_tag(self, widget):
+        widget.bindtags((WAKE_TAG,) + tuple(t for t in widget.bindtags() if t != WAKE_TAG))
+        for child in widget.winfo_children():
+            self._install_wake_tag(child)
+
+    def _on_touch(self, event):
+        if self.power.note_activity(datetime.now()):
+            self._on_power_mode_changed()
+            # Toque com a tela em economia só acorda: não chega ao botão sob o dedo
+            self._swallow_release = True
+            return "break"
+
+    def _on_touch_release(self, event):
+        if self._swallow_release:
+            self._swallow_release = False
+            return "break"
+
+    def _schedule(self, name: str, base_ms: int, func, since: datetime | None = None):
+        # `since`: quando a espera começou; o tempo já esperado conta para o novo intervalo
+        since = since or datetime.now()
+        elapsed_ms = (datetime.now() - since).total_seconds() * 1000
+        delay_ms = max(int(self.power.interval(name, base_ms) - elapsed_ms), 0)
+        after_id = self.after(delay_ms, func)
+        self._ticks[name] = (after_id, base_ms, func, since)
+
+    def _on_power_mode_changed(self, current: str = ""):
+        # Reagenda os ticks pendentes com os intervalos do novo modo (menos o que está rodando,
+        # que se reagenda sozinho ao terminar), sem perder o tempo que já esperaram
+        for name, (after_id, base_ms, func, since) in list(self._ticks.items()):
+            if name != current:
+                self.after_cancel(after_id)
+                self._schedule(name, base_ms, func, since)
+        main: MainScreen = self.frames.get("MainScreen")  # type: ignore
+        if main:
+            main.update_clock()
+
+    def _next_alarm_time(self, now: datetime):
+        # Recalcula só quando os alarmes mudam, o dia vira ou o alarme em cache já passou
+        key = (self.store.revision, now.date())
+        cached = self._next_alarm_cache
+        if cached is None or cached[0] != key or (cached[1] is not None and now >= cached[1]):
+            cached = self._next_alarm_cache = (key, self.store.get_next_alarm_time(now))
+        return cached[1]
+
+    def _power_wakeup(self, name: str, network: bool = False):
+        now = datetime.now()
+        if self.power.update(now, self._next_alarm_time(now), self.audio.is_playing()):
+            self._on_power_mode_changed(current=name)
+        self.power.wakeup(now, network)
+
     def show_frame(self, name: str):
         frame = self.frames[name]
         frame.tkraise()
@@ -362,31 +537,75 @@ class PiClockApp(tk.Tk):
             frame.on_show()
 
     def _tick_clock(self):
+        self._power_wakeup("clock")
         main: MainScreen = self.frames.get("MainScreen")  # type: ignore
         if main:
             main.update_clock()
-        self.after(REFRESH_CLOCK_MS, self._tick_clock)
+        self._schedule("clock", REFRESH_CLOCK_MS, self._tick_clock)
 
     def _tick_weather(self):
+        self._power_wakeup("weather", network=True)
         self.weather = fetch_weather(CITY, COUNTRY_CODE, OWM_API_KEY)
         main: MainScreen = self.frames.get("MainScreen")  # type: ignore
         if main:
             main.update_weather()
-        self.after(REFRESH_WEATHER_MS, self._tick_weather)
+        self._schedule("weather", REFRESH_WEATHER_MS, self._tick_weather)
+
+    def _tick_sync(self):
+        self._power_wakeup("sync", network=True)
+        # Pull/push são várias requisições bloqueantes: rodam numa thread de fundo e só a
+        # aplicação das mudanças volta para a thread do Tkinter
+        if not self._sync_running:
+            self._sync_running = True
+            alarms = [a.to_dict() for a in self.store.alarms if not a.once]
+            threading.Thread(target=self._sync_worker, args=(alarms,), daemon=True).start()
+        self._schedule("sync", SYNC_ALARMS_MS, self._tick_sync)
+
+    def _sync_worker(self, alarms: list[dict]):
+        try:
+            self.sync.sync(alarms, apply=lambda upserts, removes:
+                           self.after(0, self._apply_synced_alarms, alarms, upserts, removes))
+        except Exception as e:
+            # Dados inesperados da nuvem não podem parar a sincronização até reiniciar o app
+            print(f"[EXCEÇÃO] Sincronização: {e}")
+        finally:
+            self._sync_running = False
+
+    def _apply_synced_alarms(self, before: list[dict], upserts: list[dict], removes: set[str]):
+        # Alarme editado aqui enquanto o ciclo rodava não é sobrescrito: o próximo ciclo o envia
+        current = {a.id: a.to_dict() for a in self.store.alarms if not a.once}
+        before = {a["id"]: a for a in before}
+        upserts = [a for a in upserts if current.get(a["id"]) == before.get(a["id"])]
+        removes = {i for i in removes if current.get(i) == before.get(i)}
+        if upserts or removes:
+            self.store.apply_changes(upserts, removes)
+            self.frames["ListAlarmsScreen"].refresh()
 
     def _tick_alarms(self):
+        self._power_wakeup("alarms")
         now = datetime.now()
         for a in self.store.alarms:
             try:
                 if a.matches_now(now):
-                    self.start_alarm()
+                    if a.once:
+                        # Soneca: volta a tocar o alarme original, sem contar um novo disparo
+                        self.start_alarm(a.snooze_of, refire=True)
+                    else:
+                        self.start_alarm(a.id)
+                    if a.once:
+                        self.store.delete(a.id)
             except Exception:
                 pass
-        self.after(CHECK_ALARMS_MS, self._tick_alarms)
+        self.store.drop_expired(now)
+        self._schedule("alarms", CHECK_ALARMS_MS, self._tick_alarms)
 
-    def start_alarm(self):
+    def start_alarm(self, alarm_id: str = "", refire: bool = False):
         if not self.audio.is_playing():
             self.audio.play()
+            if refire:
+                self.history.rearm(alarm_id)
+            else:
+                self.history.record(EVENT_FIRE, alarm_id)
         main: MainScreen = self.frames.get("MainScreen")
         if main:
             main.set_alarm_state(True)
@@ -403,26 +622,29 @@ class PiClockApp(tk.Tk):
             "date_day": {"value": now.day},
             "timestamp": {"value": int(time.time())},
         }
-        threading.Thread(target=ubidots_send_batch, args=(payload,), daemon=True).start()
+        ubidots_send_async(payload)
 
-    def stop_alarm(self):
+    def stop_alarm(self, record: bool = True):
         if self.audio.is_playing():
             self.audio.stop()
+            if record:
+                self.history.record(EVENT_STOP)
         main: MainScreen = self.frames.get("MainScreen")
         if main:
             main.set_alarm_state(False)
             main.update_test_btn()
 
-        threading.Thread(
-    target=ubidots_send_batch, args=({"alarme_event": {"value": 0}},), daemon=True
-).start()
+        ubidots_send_async({"alarme_event": {"value": 0}})
 
     def snooze_alarm(self):
         now = datetime.now()
         snooze_time = now + timedelta(minutes=5)
-        self.store.add(snooze_time.hour, snooze_time.minute, [snooze_time.weekday()])
+        alarm_id = self.history.pending_alarm_id()
+        self.history.record(EVENT_SNOOZE)
+        self.store.add(snooze_time.hour, snooze_time.minute, [snooze_time.weekday()],
+                       once=True, snooze_of=alarm_id, on_date=snooze_time.date().isoformat())
         messagebox.showinfo("Adiar Alarme", f"Alarme adiado para {snooze_time.strftime('%H:%M')}")
-        self.stop_alarm()
+        self.stop_alarm(record=False)
 
         payload = {
             "alarme_soneca": {"value": 1, "context": {"nova_hora": snooze_time.strftime("%H:%M")}},
@@ -433,29 +655,32 @@ class PiClockApp(tk.Tk):
             "date_minute": {"value": snooze_time.minute},
             "timestamp": {"value": int(time.time())},
         }
-        threading.Thread(target=ubidots_send_batch, args=(payload,), daemon=True).start()
+        ubidots_send_async(payload)
 
     def _tick_remote_commands(self):
         """Verifica no Ubidots se deve tocar ou parar o alarme."""
+        self._power_wakeup("remote", network=True)
         value = ubidots_get_last_value("remote_alarm_trigger")
 
         if value is None:
             # Nenhum valor obtido — apenas agenda próxima checagem
-            self.after(1000, self._tick_remote_commands)
+            self._schedule("remote", REMOTE_RETRY_MS, self._tick_remote_commands)
             return
 
         # Se valor == 1 → garantir que o alarme esteja tocando
         if value == 1 and not self.audio.is_playing():
             print("[UBIDOTS] Comando remoto: TOCAR alarme")
+            self.history.record(EVENT_REMOTE, value=value)
             self.start_alarm()
 
         # Se valor == 0 → garantir que o alarme pare
         elif value == 0 and self.audio.is_playing():
             print("[UBIDOTS] Comando remoto: PARAR alarme")
+            self.history.record(EVENT_REMOTE, value=value)
             self.stop_alarm()
 
-        # Continua checando a cada 5 segundos
-        self.after(5000, self._tick_remote_commands)
+        # Continua checando a cada 5 segundos (mais espaçado em modo de economia)
+        self._schedule("remote", REMOTE_POLL_MS, self._tick_remote_commands)
 
 
 # ====== TELAS ======
@@ -598,7 +823,7 @@ class MainScreen(ttk.Frame):
                 "date_minute": {"value": now.minute},
                 "timestamp": {"value": int(time.time())},
             }
-            threading.Thread(target=ubidots_send_batch, args=(payload,), daemon=True).start()
+            ubidots_send_async(payload)
 
 # ====== Nova tela: criação de alarmes ======
 class NewAlarmScreen(ttk.Frame):
@@ -730,6 +955,7 @@ class ListAlarmsScreen(ttk.Frame):
 
 # ====== MAIN ======
 if __name__ == "__main__":
+    install_dns_cache()
     app = PiClockApp()
     app.mainloop()
 
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Modo de economia de energia do PiClock.
+
+O `PowerGovernor` escolhe um modo a cada tick:
+- "active": uso normal (toque recente, alarme tocando ou perto de tocar);
+- "idle":   sem toque há algum tempo, fora do horário silencioso;
+- "quiet":  horário silencioso (madrugada) sem toque recente;
+- "prealarm": perto do próximo alarme, sem toque recente.
+
+Em "idle" e "quiet" os intervalos de relógio, checagem de alarmes, clima e
+comandos remotos são multiplicados e a luz de fundo é reduzida via sysfs.
+Em "prealarm" os intervalos voltam aos do modo ativo para não atrasar o
+disparo, mas a luz de fundo fica no nível de repouso até o alarme tocar
+ou a tela ser tocada.
+Também contabiliza wakeups e requisições de rede por hora em cada modo.
+"""
+
+import glob
+import os
+
+from httpclient import client as http
+
+MODE_ACTIVE = "active"
+MODE_IDLE = "idle"
+MODE_QUIET = "quiet"
+MODE_PREALARM = "prealarm"
+MODES = (MODE_ACTIVE, MODE_IDLE, MODE_QUIET, MODE_PREALARM)
+
+QUIET_HOURS = (23, 6)       # das 23h às 6h
+IDLE_TIMEOUT_S = 5 * 60     # sem toque por 5 min → idle
+PREALARM_MIN = 15           # volta aos intervalos do modo ativo 15 min antes do próximo alarme
+
+INTERVAL_FACTORS = {MODE_ACTIVE: 1, MODE_IDLE: 3, MODE_QUIET: 10, MODE_PREALARM: 1}
+# Alarmes são checados por minuto: o intervalo nunca pode chegar a 60 s
+INTERVAL_MAX_MS = {"clock": 15 * 1000, "alarms": 15 * 1000}
+# Sem nível para "prealarm": mantém o do modo de repouso (idle ou quiet) em que estaria
+BACKLIGHT_LEVELS = {MODE_ACTIVE: 100, MODE_IDLE: 40, MODE_QUIET: 10}
+
+
+class Backlight:
+    """Luz de fundo via sysfs (`brightness` / `max_brightness`). Sem dispositivo, não faz nada."""
+
+    def __init__(self, path: str = ""):
+        if not path:
+            found = sorted(glob.glob("/sys/class/backlight/*"))
+            path = found[0] if found else ""
+        self.path = path
+        self.max = 0
+        self.percent = None
+        if path:
+            try:
+                with open(os.path.join(path, "max_brightness")) as f:
+                    self.max = int(f.read().strip())
+            except (OSError, ValueError) as e:
+                print(f"[ENERGIA] Luz de fundo indisponível: {e}")
+                self.path = ""
+
+    def set(self, percent: int):
+        if not self.path or percent == self.percent:
+            return
+        value = max(1, round(self.max * percent / 100))
+        try:
+            with open(os.path.join(self.path, "brightness"), "w") as f:
+                f.write(str(value))
+            self.percent = percent
+        except OSError as e:
+            print(f"[ENERGIA] Falha ao ajustar luz de fundo: {e}")
+            self.path = ""
+
+
+class PowerGovernor:
+    def __init__(self, backlight: Backlight | None = None, quiet_hours: tuple[int, int] = QUIET_HOURS,
+                 idle_timeout_s: int = IDLE_TIMEOUT_S, prealarm_min: int = PREALARM_MIN):
+        self.backlight = backlight or Backlight()
+        self.quiet_hours = quiet_hours
+        self.idle_timeout_s = idle_timeout_s
+        self.prealarm_s = prealarm_min * 60
+        self.mode = MODE_ACTIVE
+        self.last_activity = None
+        self.stats = {m: {"seconds": 0.0, "wakeups": 0, "net_polls": 0, "requests": 0} for m in MODES}
+        self._last_wakeup = None
+        self._last_requests = http.total_requests()
+        self.backlight.set(BACKLIGHT_LEVELS[self.mode])
+
+    def _in_quiet_hours(self, now) -> bool:
+        start, end = self.quiet_hours
+        if start <= end:
+            return start <= now.hour < end
+        return now.hour >= start or now.hour < end
+
+    def _set_mode(self, mode: str, light_mode: str | None = None) -> bool:
+        # Backlight.set ignora o nível repetido; a luz pode mudar sem mudar o modo (prealarm)
+        self.backlight.set(BACKLIGHT_LEVELS[light_mode or mode])
+        if mode == self.mode:
+            return False
+        print(f"[ENERGIA] Modo {self.mode} → {mode}")
+        self.mode = mode
+        return True
+
+    def update(self, now, next_alarm_at=None, alarm_active: bool = False) -> bool:
+        """Recalcula o modo. Devolve True se ele mudou."""
+        if self.last_activity is None:
+            self.last_activity = now
+        if alarm_active or (now - self.last_activity).total_seconds() < self.idle_timeout_s:
+            return self._set_mode(MODE_ACTIVE)
+        resting = MODE_QUIET if self._in_quiet_hours(now) else MODE_IDLE
+        if next_alarm_at is not None and (next_alarm_at - now).total_seconds() <= self.prealarm_s:
+            # Intervalos curtos para não atrasar o disparo, sem acender a tela no quarto escuro
+            return self._set_mode(MODE_PREALARM, light_mode=resting)
+        return self._set_mode(resting)
+
+    def note_activity(self, now) -> bool:
+        """Toque na tela: volta na hora ao modo ativo. Devolve True se o modo mudou."""
+        self.last_activity = now
+        return self._set_mode(MODE_ACTIVE)
+
+    def interval(self, name: str, base_ms: int) -> int:
+        ms = base_ms * INTERVAL_FACTORS[self.mode]
+        return min(ms, INTERVAL_MAX_MS.get(name, ms))
+
+    def wakeup(self, now, network: bool = False):
+        """Contabiliza um tick no modo atual (tempo, wakeups e requisições de rede)."""
+        s = self.stats[self.mode]
+        if self._last_wakeup is not None:
+            s["seconds"] += max((now - self._last_wakeup).total_seconds(), 0.0)
+        self._last_wakeup = now
+        s["wakeups"] += 1
+        if network:
+            s["net_polls"] += 1
+        total = http.total_requests()
+        s["requests"] += total - self._last_requests
+        self._last_requests = total
+
+    def report(self) -> dict:
+        """Wakeups, consultas de rede e requisições HTTP por hora em cada modo."""
+        out = {}
+        for mode, s in self.stats.items():
+            hours = s["seconds"] / 3600
+            out[mode] = {
+                "hours": round(hours, 2),
+                "wakeups_per_hour": round(s["wakeups"] / hours, 1) if hours else 0.0,
+                "net_polls_per_hour": round(s["net_polls"] / hours, 1) if hours else 0.0,
+                "requests_per_hour": round(s["requests"] / hours, 1) if hours else 0.0,
+            }
+        return out
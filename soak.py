@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de resistência (soak test) do PiClock.
+
+Roda o núcleo do app (os mesmos métodos de tick do PiClockApp) com um relógio
+simulado e acelerado, por vários dias simulados, e periodicamente mede:
+heap Python (tracemalloc), threads vivas, descritores de arquivo abertos, RSS e
+número de alarmes salvos. Falha (código de saída 1) se o crescimento passar dos
+limites configurados e imprime os maiores alocadores desde o início.
+
+Ao final também mostra, por modo de energia, os wakeups e as consultas de rede
+por hora (a luz de fundo usa um sysfs falso no diretório temporário).
+
+Uso:
+    python soak.py --days 7
+    python soak.py --days 2 --tk          # com a interface Tk (usa Xvfb se não houver DISPLAY)
+    python soak.py --days 2 --network     # clima e Ubidots num servidor local falso (nunca nas APIs reais)
+"""
+
+import argparse
+import contextlib
+import gc
+import heapq
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import urlsplit
+
+import piclock
+
+
+# ====== RELÓGIO SIMULADO ======
+class SimClock:
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def now(self) -> datetime:
+        return self.current
+
+
+def _install_clock(clock: SimClock):
+    """Faz o `datetime.now()` usado pelo piclock devolver a hora simulada."""
+
+    class _SimDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now()
+
+    piclock.datetime = _SimDatetime
+
+
+class _SilentAudio:
+    def __init__(self):
+        self.playing = False
+
+    def play(self, filepath=None, loop=True):
+        self.playing = True
+
+    def stop(self):
+        self.playing = False
+
+    def is_playing(self):
+        return self.playing
+
+    @staticmethod
+    def set_volume(percent: int):
+        pass
+
+
+class _NullOutput:
+    """Destino do --quiet: descarta o texto na hora (um arquivo com buffer acumularia os prints)."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+# O próprio harness e o tracemalloc não entram no relatório de maiores alocadores (o filtro
+# só é aplicado depois das fotos: o fnmatch dele também alocaria durante a medição)
+_SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, tracemalloc.__file__),
+)
+
+
+class _SimLoop:
+    """Substitui o `after` do Tk por uma fila de eventos no tempo simulado."""
+
+    def _init_loop(self, clock: SimClock):
+        self.clock = clock
+        self._queue = []
+        self._seq = 0
+        self._cancelled = set()
+
+    def after(self, ms, func=None, *args):
+        if func is None or not isinstance(ms, (int, float)):
+            return super().after(ms, func, *args)  # usos internos do Tk (ex.: after_idle)
+        self._seq += 1
+        due = self.clock.now() + timedelta(milliseconds=ms)
+        heapq.heappush(self._queue, (due, self._seq, func, args))
+        return f"sim#{self._seq}"
+
+    def after_cancel(self, after_id):
+        if isinstance(after_id, str) and after_id.startswith("sim#"):
+            self._cancelled.add(int(after_id[4:]))
+            return
+        return super().after_cancel(after_id)
+
+    def run_until(self, until: datetime):
+        while self._queue and self._queue[0][0] <= until:
+            due, seq, func, args = heapq.heappop(self._queue)
+            if seq in self._cancelled:
+                self._cancelled.discard(seq)
+                continue
+            self.clock.current = due
+            func(*args)
+        self.clock.current = until
+
+
+class HeadlessCore(_SimLoop):
+    """Núcleo do PiClockApp sem Tk: mesmos métodos, sem telas."""
+
+    _tick_clock = piclock.PiClockApp._tick_clock
+    _tick_alarms = piclock.PiClockApp._tick_alarms
+    _tick_weather = piclock.PiClockApp._tick_weather
+    _tick_remote_commands = piclock.PiClockApp._tick_remote_commands
+    _power_wakeup = piclock.PiClockApp._power_wakeup
+    _next_alarm_time = piclock.PiClockApp._next_alarm_time
+    _on_power_mode_changed = piclock.PiClockApp._on_power_mode_changed
+    _on_touch = piclock.PiClockApp._on_touch
+    _schedule = piclock.PiClockApp._schedule
+    start_alarm = piclock.PiClockApp.start_alarm
+    stop_alarm = piclock.PiClockApp.stop_alarm
+    snooze_alarm = piclock.PiClockApp.snooze_alarm
+
+    def __init__(self, clock: SimClock):
+        self._init_loop(clock)
+        self.store = piclock.AlarmStore(piclock.ALARM_FILE)
+        self.history = piclock.EventHistory(piclock.HISTORY_FILE)
+        self.audio = piclock.AudioPlayer()
+        self.power = piclock.PowerGovernor(piclock.Backlight(piclock.BACKLIGHT_DIR))
+        self._next_alarm_cache = None
+        self._ticks = {}
+        self._swallow_release = False
+        self.weather = None
+        self.frames = {}
+        self.after(piclock.REFRESH_CLOCK_MS, self._tick_clock)
+        self.after(piclock.CHECK_ALARMS_MS, self._tick_alarms)
+        self.after(100, self._tick_weather)
+        self.after(piclock.REMOTE_RETRY_MS, self._tick_remote_commands)
+
+    def resize(self, width: int, height: int):
+        pass
+
+    def pump(self):
+        pass
+
+    def close(self):
+        self.history.close()
+
+
+class TkCore(_SimLoop, piclock.PiClockApp):
+    def __init__(self, clock: SimClock):
+        self._init_loop(clock)
+        piclock.PiClockApp.__init__(self)
+
+    def resize(self, width: int, height: int):
+        self.geometry(f"{width}x{height}")
+
+    def pump(self):
+        self.update()
+
+    def close(self):
+        self.history.close()
+        self.destroy()
+
+
+# ====== MEDIÇÕES ======
+def _open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _sample(core, sim_now: datetime) -> dict:
+    gc.collect()
+    heap, _ = tracemalloc.get_traced_memory()
+    return {
+        "sim": sim_now,
+        "heap_kb": heap // 1024,
+        "threads": threading.active_count(),
+        "fds": _open_fds(),
+        "rss_kb": _rss_kb(),
+        "alarms": len(core.store.alarms),
+    }
+
+
+def _fake_backlight(workdir: str) -> str:
+    path = os.path.join(workdir, "backlight")
+    os.makedirs(path)
+    for name, value in (("max_brightness", "255"), ("brightness", "255")):
+        with open(os.path.join(path, name), "w") as f:
+            f.write(value)
+    return path
+
+
+class StubServer:
+    """
+    Servidor local que imita o OpenWeatherMap e o Ubidots, para o modo --network
+    exercitar o caminho de rede de verdade sem gastar o token nem as APIs reais.
+    O `remote_alarm_trigger` começa em 0 (switch do dashboard desligado).
+    """
+
+    WEATHER = {
+        "main": {"temp": 22.4, "temp_min": 18.1, "temp_max": 27.3},
+        "weather": [{"main": "Clouds", "description": "nublado"}],
+    }
+
+    def __init__(self):
+        self.values = {"remote_alarm_trigger": 0}
+        self.requests = 0
+        # Servidor de uma thread só, para não criar threads por requisição durante as medições
+        self.httpd = HTTPServer(("127.0.0.1", 0), self._handler())
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def _reply(self, status: int, data):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                stub.requests += 1
+                path = urlsplit(self.path).path.rstrip("/")
+                if path.endswith("/weather"):
+                    return self._reply(200, stub.WEATHER)
+                parts = path.split("/")
+                if path.endswith("/values"):
+                    value = stub.values.get(parts[-2])
+                    return self._reply(200, {"results": [] if value is None else [{"value": value}]})
+                if path.endswith("/lv") and parts[-2] in stub.values:
+                    return self._reply(200, stub.values[parts[-2]])
+                self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                stub.requests += 1
+                data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                parts = urlsplit(self.path).path.rstrip("/").split("/")
+                if parts[-1] == "values":
+                    stub.values[parts[-2]] = data.get("value")
+                    return self._reply(201, data)
+                self._reply(404, {"error": "not found"})
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _start_xvfb():
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        sys.exit("[SOAK] --tk precisa de um DISPLAY ou do Xvfb instalado")
+    display = ":99"
+    proc = subprocess.Popen(["Xvfb", display, "-screen", "0", "1024x600x24"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = display
+    time.sleep(1)
+    return proc
+
+
+# ====== EXECUÇÃO ======
+def run(args) -> int:
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="piclock-soak-")
+    piclock.ALARM_FILE = os.path.join(workdir, "alarms.json")
+    piclock.HISTORY_FILE = os.path.join(workdir, "events.bin")
+    piclock.BACKLIGHT_DIR = _fake_backlight(workdir)
+    piclock.AudioPlayer = _SilentAudio
+    piclock.messagebox.showinfo = lambda *a, **k: None
+    stub = None
+    if args.network:
+        stub = StubServer().start()
+        piclock.UBIDOTS_API_URL = f"{stub.url}/api/v1.6"
+        piclock.OWM_API_URL = f"{stub.url}/data/2.5/weather"
+        piclock.UBIDOTS_TOKEN = "soak"
+        piclock.OWM_API_KEY = "soak"
+    else:
+        piclock.UBIDOTS_TOKEN = ""
+        piclock.OWM_API_KEY = ""
+
+    clock = SimClock(datetime(2025, 1, 6, 0, 0))
+    _install_clock(clock)
+    xvfb = _start_xvfb() if args.tk else None
+
+    tracemalloc.start(args.frames)
+    out = _NullOutput() if args.quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(out):
+            core = TkCore(clock) if args.tk else HeadlessCore(clock)
+            for hour, minute in ((6, 30), (7, 0), (22, 15)):
+                core.store.add(hour, minute, list(range(7)))
+
+            end = clock.now() + timedelta(days=args.days)
+            step = timedelta(minutes=args.step_min)
+            sample_every = timedelta(hours=args.sample_hours)
+            warmup_end = clock.now() + timedelta(hours=args.warmup_hours)
+            next_sample = warmup_end
+            baseline, baseline_snap = None, None
+            samples = []
+            respond_at = None
+            sizes = [(800, 480), (1024, 600)]
+
+            while clock.now() < end:
+                core.run_until(clock.now() + step)
+
+                # Usuário simulado: responde ao alarme com soneca ou parada
+                if core.audio.is_playing():
+                    if respond_at is None:
+                        respond_at = clock.now() + timedelta(seconds=rng.randint(30, 600))
+                    elif clock.now() >= respond_at:
+                        if rng.random() < args.snooze_prob:
+                            core.snooze_alarm()
+                        else:
+                            core.stop_alarm()
+                        respond_at = None
+
+                # Toques na tela durante o dia (mantêm o modo ativo)
+                if 7 <= clock.now().hour < 22 and rng.random() < args.touch_prob:
+                    core._on_touch(None)
+
+                # Redimensionamentos disparam <Configure> (e _build_fonts)
+                if rng.random() < args.resize_prob:
+                    core.resize(*sizes[rng.randrange(len(sizes))])
+                core.pump()
+
+                if clock.now() >= next_sample:
+                    s = _sample(core, clock.now())
+                    if baseline is None:
+                        baseline, baseline_snap = s, tracemalloc.take_snapshot()
+                    samples.append(s)
+                    next_sample += sample_every
+
+            final_snap = tracemalloc.take_snapshot()
+            power = core.power.report()
+            core.close()
+    finally:
+        tracemalloc.stop()
+        if xvfb:
+            xvfb.terminate()
+        if stub:
+            stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'sim':<17} {'heap_kb':>8} {'threads':>7} {'fds':>5} {'rss_kb':>8} {'alarms':>6}")
+    for s in samples:
+        print(f"{s['sim']:%Y-%m-%d %H:%M} {s['heap_kb']:>8} {s['threads']:>7} "
+              f"{s['fds']:>5} {s['rss_kb']:>8} {s['alarms']:>6}")
+
+    print(f"\nMaiores alocadores desde a linha de base (top {args.top}):")
+    top = final_snap.filter_traces(_SNAPSHOT_FILTERS).compare_to(
+        baseline_snap.filter_traces(_SNAPSHOT_FILTERS), "lineno")
+    for stat in top[:args.top]:
+        print(f"  {stat}")
+
+    print("\nEnergia por modo:")
+    print(f"  {'modo':<8} {'horas':>7} {'wakeups/h':>10} {'rede/h':>8} {'http/h':>8}")
+    for mode, r in power.items():
+        print(f"  {mode:<8} {r['hours']:>7} {r['wakeups_per_hour']:>10} "
+              f"{r['net_polls_per_hour']:>8} {r['requests_per_hour']:>8}")
+
+    last = samples[-1]
+    budgets = {
+        "heap_kb": args.max_heap_kb,
+        "threads": args.max_threads,
+        "fds": args.max_fds,
+        "rss_kb": args.max_rss_kb,
+        "alarms": args.max_alarms,
+    }
+    failed = False
+    print()
+    for key, limit in budgets.items():
+        growth = last[key] - baseline[key]
+        ok = growth <= limit
+        failed |= not ok
+        print(f"[{'OK' if ok else 'FALHA'}] {key}: +{growth} (limite +{limit})")
+    return 1 if failed else 0
+
+
+def main():
+    p = argparse.ArgumentParser(description="Soak test do PiClock com relógio acelerado")
+    p.add_argument("--days", type=float, default=7, help="dias simulados")
+    p.add_argument("--step-min", type=float, default=1, help="minutos simulados por iteração")
+    p.add_argument("--sample-hours", type=float, default=6, help="intervalo entre medições (horas simuladas)")
+    p.add_argument("--warmup-hours", type=float, default=24, help="aquecimento antes da linha de base")
+    p.add_argument("--tk", action="store_true", help="roda com a interface Tk (Xvfb se não houver DISPLAY)")
+    p.add_argument("--network", action="store_true",
+                   help="exercita o caminho de rede contra um servidor local falso (padrão: sem rede)")
+    p.add_argument("--snooze-prob", type=float, default=0.5)
+    p.add_argument("--resize-prob", type=float, default=0.01)
+    p.add_argument("--touch-prob", type=float, default=0.02, help="chance de toque por iteração (7h–22h)")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--frames", type=int, default=1, help="profundidade de pilha do tracemalloc")
+    p.add_argument("--top", type=int, default=10, help="quantos alocadores listar")
+    p.add_argument("--max-heap-kb", type=int, default=512)
+    p.add_argument("--max-threads", type=int, default=0)
+    p.add_argument("--max-fds", type=int, default=0)
+    p.add_argument("--max-rss-kb", type=int, default=8192)
+    p.add_argument("--max-alarms", type=int, default=1)
+    p.add_argument("--verbose", dest="quiet", action="store_false", help="mostra os prints do app")
+    args = p.parse_args()
+    if args.days * 24 <= args.warmup_hours:
+        p.error("--days precisa cobrir mais que o aquecimento")
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sincronização incremental dos alarmes com a nuvem.
+
+O `AlarmSync` compara o estado atual do `AlarmStore` com o último estado
+sincronizado (impressões digitais por `Alarm.id`), busca na nuvem só o que
+mudou desde a última versão conhecida e aplica as diferenças por id. As
+alterações locais são enviadas num único lote.
+
+Conflitos (o mesmo alarme editado aqui e na nuvem) são resolvidos de forma
+determinística: vence o `updated_at` mais recente; em empate, vence a maior
+impressão digital. Edição sempre vence exclusão. Alarmes de uso único
+(soneca) são locais e não sincronizam.
+
+Transportes:
+- `HttpSyncTransport`: servidor com versão/ETag e deltas (ex.: `LocalSyncServer`).
+- `UbidotsSyncTransport`: uma variável do Ubidots cujo valor é a versão e cujo
+  contexto guarda a lista completa; a diferença é calculada aqui.
+
+Uso:
+    python sync.py serve --port 8765      # servidor local de testes
+    python sync.py bench --alarms 50      # mede banda e tempo de aplicação
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from httpclient import client as http
+
+SYNC_STATE_FILE = "sync_state.json"
+SYNC_FIELDS = ("hour", "minute", "days", "enabled")
+
+
+class SyncUnavailable(Exception):
+    pass
+
+
+def fingerprint(d: dict) -> str:
+    fields = {k: d.get(k) for k in SYNC_FIELDS}
+    fields["days"] = sorted(fields["days"] or [])
+    return json.dumps(fields, sort_keys=True, separators=(",", ":"))
+
+
+def _remote_wins(remote: dict, local: dict) -> bool:
+    r, l = remote.get("updated_at", 0.0), local.get("updated_at", 0.0)
+    if r != l:
+        return r > l
+    return fingerprint(remote) >= fingerprint(local)
+
+
+# ====== TRANSPORTES ======
+class _Transport:
+    def __init__(self):
+        self.requests = 0
+        self.bytes_up = 0
+        self.bytes_down = 0
+
+    def _count(self, resp, body: bytes = b""):
+        self.requests += 1
+        self.bytes_up += len(body)
+        if resp is not None:
+            self.bytes_down += len(resp.content)
+
+
+class HttpSyncTransport(_Transport):
+    """GET /alarms?since=<versão> (com If-None-Match) e POST /alarms com o lote local."""
+
+    def __init__(self, base_url: str):
+        super().__init__()
+        self.url = base_url.rstrip("/") + "/alarms"
+
+    def pull(self, version: int, etag: str | None):
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = http.get(self.url, params={"since": version}, headers=headers, timeout=5)
+        self._count(resp)
+        if resp is None or resp.status_code not in (200, 304):
+            raise SyncUnavailable(resp.status_code if resp is not None else "sem conexão")
+        if resp.status_code == 304:
+            return None
+        data = resp.json()
+        data["etag"] = resp.headers.get("ETag")
+        return data
+
+    def push(self, alarms: list[dict], deleted: list[str], base_version: int, snapshot: list[dict]):
+        body = json.dumps({"base_version": base_version, "alarms": alarms, "deleted": deleted}).encode("utf-8")
+        resp = http.post(self.url, data=body, headers={"Content-Type": "application/json"}, timeout=5)
+        self._count(resp, body)
+        if resp is None or resp.status_code != 200:
+            # 409: a nuvem mudou desde o pull; o lote é reenviado no próximo ciclo
+            raise SyncUnavailable(resp.status_code if resp is not None else "sem conexão")
+        data = resp.json()
+        return data["version"], resp.headers.get("ETag")
+
+
+class UbidotsSyncTransport(_Transport):
+    """
+    Variável `alarm_config`: o valor é o número da versão e o contexto guarda
+    a lista de alarmes em JSON e um hash do conteúdo. O pull lê só o último
+    valor (/lv, poucos bytes) e baixa a lista apenas quando a versão mudou.
+    Se a variável ainda não existe (404), vale como versão 0 vazia e o
+    primeiro envio a cria.
+
+    O Ubidots não tem compare-and-swap: dois aparelhos podem gravar a mesma
+    versão e um deles perder a escrita. Por isso o conteúdo é relido logo
+    após o envio e de novo no pull seguinte; se a versão é a nossa mas o
+    hash não, o pull devolve a lista completa com "rebase" e o motor refaz
+    a mesclagem de todos os alarmes.
+    """
+
+    def __init__(self, token: str, device: str, variable: str = "alarm_config",
+                 api_url: str = "https://industrial.api.ubidots.com/api/v1.6"):
+        super().__init__()
+        self.url = f"{api_url}/devices/{device}/{variable}"
+        self.headers = {"X-Auth-Token": token}
+        self._verify = False  # conferir a última escrita no próximo pull
+
+    def _get(self, path: str, **kwargs):
+        resp = http.get(f"{self.url}/{path}", headers=self.headers, timeout=5, **kwargs)
+        self._count(resp)
+        if resp is None or resp.status_code not in (200, 404):
+            raise SyncUnavailable(resp.status_code if resp is not None else "sem conexão")
+        return resp
+
+    def _fetch_last(self):
+        """Última lista gravada: (versão, alarmes, hash). Variável inexistente = versão 0 vazia."""
+        resp = self._get("values", params={"page_size": 1})
+        results = resp.json().get("results") if resp.status_code == 200 else None
+        if not results:
+            return 0, [], None
+        context = results[0].get("context") or {}
+        version = int(float(results[0].get("value") or 0))
+        return version, json.loads(context.get("alarms", "[]")), context.get("hash")
+
+    def pull(self, version: int, etag: str | None):
+        if not self._verify:
+            resp = self._get("lv")
+            remote_version = int(float(resp.text)) if resp.status_code == 200 else 0
+            if remote_version == version:
+                return None
+        remote_version, alarms, content_hash = self._fetch_last()
+        # Mesma versão com outro conteúdo: nossa escrita foi sobrescrita. Variável sumiu: idem.
+        lost_write = self._verify and remote_version == version and content_hash != etag
+        rebase = lost_write or (remote_version == 0 and version != 0)
+        self._verify = False
+        if remote_version == version and not rebase:
+            return None
+        return {"version": remote_version, "etag": content_hash, "alarms": alarms, "full": True,
+                "rebase": rebase}
+
+    def push(self, alarms: list[dict], deleted: list[str], base_version: int, snapshot: list[dict]):
+        # O Ubidots não tem atualização parcial: envia a lista completa já mesclada
+        version = base_version + 1
+        encoded = json.dumps(snapshot, sort_keys=True, separators=(",", ":"))
+        content_hash = hashlib.sha1(encoded.encode("utf-8")).hexdigest()[:16]
+        payload = {"value": version, "context": {"alarms": encoded, "hash": content_hash}}
+        body = json.dumps(payload).encode("utf-8")
+        headers = {**self.headers, "Content-Type": "application/json"}
+        resp = http.post(f"{self.url}/values", data=body, headers=headers, timeout=10)
+        self._count(resp, body)
+        if resp is None or resp.status_code >= 400:
+            raise SyncUnavailable(resp.status_code if resp is not None else "sem conexão")
+        _, _, stored_hash = self._fetch_last()
+        if stored_hash != content_hash:
+            # Outro aparelho gravou por cima: o lote continua pendente e o próximo pull mescla
+            raise SyncUnavailable("escrita concorrente")
+        self._verify = True
+        return version, content_hash
+
+
+# ====== MOTOR ======
+class AlarmSync:
+    def __init__(self, store, transport, state_path: str = SYNC_STATE_FILE):
+        self.store = store
+        self.transport = transport
+        self.state_path = state_path
+        self.version = 0
+        self.etag = None
+        self.synced: dict[str, str] = {}  # id -> impressão digital na última sincronização
+        self.last_stats = None
+        self.totals = {"syncs": 0, "requests": 0, "bytes_up": 0, "bytes_down": 0, "apply_ms": 0.0}
+        self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.version = int(data.get("version", 0))
+            self.etag = data.get("etag")
+            self.synced = dict(data.get("synced", {}))
+        except Exception:
+            self.version, self.etag, self.synced = 0, None, {}
+
+    def _save_state(self):
+        data = {"version": self.version, "etag": self.etag, "synced": self.synced}
+        tmp = self.state_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.state_path)
+
+    def sync(self, alarms: list[dict] | None = None, apply=None):
+        """
+        Executa um ciclo. Devolve as medições do ciclo, ou None se a nuvem estiver indisponível.
+
+        Para rodar fora da thread do Tkinter, o chamador passa a foto dos alarmes fixos
+        (`alarms`, em dicts) e `apply(upserts, removes)`, que aplica as mudanças na thread
+        dele; por padrão o ciclo lê e altera o próprio `store`.
+        """
+        if alarms is None:
+            alarms = [a.to_dict() for a in self.store.alarms if not a.once]
+        apply = apply or self.store.apply_changes
+        t = self.transport
+        before = (t.requests, t.bytes_up, t.bytes_down)
+        apply_s = 0.0
+        changed_state = False
+        pushed = 0
+
+        start = time.perf_counter()
+        local = {a["id"]: a for a in alarms}
+        dirty = {i: d for i, d in local.items() if self.synced.get(i) != fingerprint(d)}
+        deleted_local = [i for i in self.synced if i not in local]
+        apply_s += time.perf_counter() - start
+
+        try:
+            remote = t.pull(self.version, self.etag)
+        except (SyncUnavailable, ValueError) as e:
+            print(f"[SYNC] Nuvem indisponível: {e}")
+            return None
+
+        upserts, removes = [], set()
+        if remote is not None:
+            start = time.perf_counter()
+            if remote.get("rebase"):
+                print("[SYNC] Lista da nuvem não é a esperada: mesclando todos os alarmes")
+                self.synced = {}
+                dirty = dict(local)
+                deleted_local = []
+            changed, remote_deleted = remote.get("alarms", []), remote.get("deleted", [])
+            if remote.get("full"):
+                remote_ids = {a["id"] for a in changed}
+                remote_deleted = [i for i in self.synced if i not in remote_ids]
+                changed = [a for a in changed if self.synced.get(a["id"]) != fingerprint(a)]
+
+            for r in changed:
+                rid = r["id"]
+                mine = dirty.get(rid)
+                if mine is not None and not _remote_wins(r, mine):
+                    continue  # a versão local vence e segue no lote de envio
+                dirty.pop(rid, None)
+                if rid in deleted_local:
+                    deleted_local.remove(rid)  # edição na nuvem vence exclusão local
+                if rid not in local or fingerprint(local[rid]) != fingerprint(r):
+                    upserts.append(r)
+                self.synced[rid] = fingerprint(r)
+
+            for rid in remote_deleted:
+                if rid in dirty:
+                    continue  # edição local vence exclusão na nuvem
+                if rid in local:
+                    removes.add(rid)
+                self.synced.pop(rid, None)
+                if rid in deleted_local:
+                    deleted_local.remove(rid)
+
+            if upserts or removes:
+                apply(upserts, removes)
+            self.version, self.etag = remote["version"], remote.get("etag")
+            changed_state = True
+            apply_s += time.perf_counter() - start
+
+        if dirty or deleted_local:
+            merged = dict(local)
+            merged.update((a["id"], a) for a in upserts)
+            for rid in removes:
+                merged.pop(rid, None)
+            snapshot = list(merged.values())
+            try:
+                self.version, self.etag = t.push(list(dirty.values()), deleted_local, self.version, snapshot)
+            except (SyncUnavailable, ValueError) as e:
+                print(f"[SYNC] Envio adiado: {e}")
+            else:
+                for rid, d in dirty.items():
+                    self.synced[rid] = fingerprint(d)
+                for rid in deleted_local:
+                    self.synced.pop(rid, None)
+                pushed = len(dirty) + len(deleted_local)
+                changed_state = True
+
+        if changed_state:
+            self._save_state()
+
+        stats = {
+            "requests": t.requests - before[0],
+            "bytes_up": t.bytes_up - before[1],
+            "bytes_down": t.bytes_down - before[2],
+            "applied": len(upserts),
+            "removed": len(removes),
+            "pushed": pushed,
+            "apply_ms": apply_s * 1000,
+        }
+        self.last_stats = stats
+        self.totals["syncs"] += 1
+        for k in ("requests", "bytes_up", "bytes_down", "apply_ms"):
+            self.totals[k] += stats[k]
+        if upserts or removes or stats["pushed"]:
+            print(f"[SYNC] v{self.version}: {stats}")
+        return stats
+
+
+# ====== SERVIDOR LOCAL ======
+class LocalSyncServer:
+    """Servidor de testes com o mesmo protocolo do HttpSyncTransport (versão + ETag + deltas)."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765):
+        self.version = 0
+        self.alarms: dict[str, tuple[dict, int]] = {}  # id -> (alarme, versão em que mudou)
+        self.tombstones: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def put(self, alarm: dict):
+        """Altera um alarme "na nuvem" (simula uma edição feita pelo dashboard)."""
+        with self._lock:
+            self.version += 1
+            self.alarms[alarm["id"]] = (alarm, self.version)
+            self.tombstones.pop(alarm["id"], None)
+
+    def remove(self, alarm_id: str):
+        with self._lock:
+            self.version += 1
+            self.alarms.pop(alarm_id, None)
+            self.tombstones[alarm_id] = self.version
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, fmt, *args):
+                pass
+
+            def _reply(self, status: int, data=None):
+                body = json.dumps(data).encode("utf-8") if data is not None else b""
+                self.send_response(status)
+                self.send_header("ETag", f'"{server.version}"')
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path != "/alarms":
+                    return self._reply(404, {"error": "not found"})
+                since = int(parse_qs(parts.query).get("since", ["0"])[0])
+                with server._lock:
+                    if self.headers.get("If-None-Match") == f'"{server.version}"':
+                        return self._reply(304)
+                    self._reply(200, {
+                        "version": server.version,
+                        "alarms": [a for a, v in server.alarms.values() if v > since],
+                        "deleted": [i for i, v in server.tombstones.items() if v > since],
+                    })
+
+            def do_POST(self):
+                if urlsplit(self.path).path != "/alarms":
+                    return self._reply(404, {"error": "not found"})
+                data = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                with server._lock:
+                    if data.get("base_version") != server.version:
+                        return self._reply(409, {"version": server.version})
+                    server.version += 1
+                    for a in data.get("alarms", []):
+                        server.alarms[a["id"]] = (a, server.version)
+                        server.tombstones.pop(a["id"], None)
+                    for i in data.get("deleted", []):
+                        server.alarms.pop(i, None)
+                        server.tombstones[i] = server.version
+                    self._reply(200, {"version": server.version})
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ====== CLI ======
+def _bench(args):
+    import tempfile
+    from piclock import AlarmStore
+
+    server = LocalSyncServer(port=0).start()
+    workdir = tempfile.mkdtemp(prefix="piclock-sync-")
+    store = AlarmStore(os.path.join(workdir, "alarms.json"))
+    engine = AlarmSync(store, HttpSyncTransport(server.url), os.path.join(workdir, "sync_state.json"))
+
+    for i in range(args.alarms):
+        server.put({"id": f"a{i}", "hour": i % 24, "minute": i % 60, "days": [0, 1, 2, 3, 4],
+                    "enabled": True, "updated_at": time.time()})
+
+    def report(label):
+        s = engine.sync()
+        print(f"{label:<28} req={s['requests']} up={s['bytes_up']}B down={s['bytes_down']}B "
+              f"apply={s['apply_ms']:.2f}ms applied={s['applied']} pushed={s['pushed']}")
+
+    report("primeira sincronização")
+    report("sem mudanças")
+    server.put({"id": "a0", "hour": 5, "minute": 45, "days": [0], "enabled": True, "updated_at": time.time()})
+    report("1 alarme alterado na nuvem")
+    store.add(9, 30, [5, 6])
+    report("1 alarme criado localmente")
+    report("sem mudanças")
+    server.stop()
+
+
+def main():
+    p = argparse.ArgumentParser(description="Sincronização de alarmes do PiClock")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    serve = sub.add_parser("serve", help="servidor local de sincronização")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    bench = sub.add_parser("bench", help="mede banda e tempo de aplicação por ciclo")
+    bench.add_argument("--alarms", type=int, default=50)
+    args = p.parse_args()
+
+    if args.cmd == "serve":
+        server = LocalSyncServer(args.host, args.port)
+        print(f"[SYNC] Servidor local em {server.url}")
+        server.httpd.serve_forever()
+    else:
+        _bench(args)
+
+
+if __name__ == "__main__":
+    main()